@@ -1,23 +1,60 @@
 import os
 import shutil
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 
+# Larger copy buffer (default 64 KB on POSIX, 1 MB on Windows) means fewer read/write calls per image
+shutil.COPY_BUFSIZE = 4 * 1024 * 1024
+
 # Path to your CSV file
 csv_path = r'/data/filtered_iqa.csv'
 
 # Target directory for filtered images
 target_dir = r'D:\iNaturalist\images_filtered'
 
+# Number of files copied concurrently (8-32 works well; network shares benefit most, local HDDs least)
+max_workers = 16
+
 # Create the target directory if it doesn't exist
 os.makedirs(target_dir, exist_ok=True)
 
-# Read the CSV file
-df = pd.read_csv(csv_path)
+# Read only the 'file_path' column of the CSV file, with Arrow's multithreaded parser when pyarrow is installed
+csv_engine = 'pyarrow' if importlib.util.find_spec('pyarrow') else 'c'
+file_paths = pd.read_csv(csv_path, usecols=['file_path'], engine=csv_engine)['file_path'].tolist()
 
-# The CSV column with full file paths is 'file_path'
-for src_path in df['file_path']:
+
+def fast_copy(src_path, dst_path):
+    """Copy a file inside the kernel (copy_file_range/sendfile), keeping copy2's metadata semantics."""
+    with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+        remaining = os.fstat(src.fileno()).st_size
+        while remaining > 0:
+            # copy_file_range can reflink on XFS/Btrfs; sendfile is the fallback on older kernels
+            if hasattr(os, 'copy_file_range'):
+                sent = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+            else:
+                sent = os.sendfile(dst.fileno(), src.fileno(), None, remaining)
+            if sent == 0:
+                break
+            remaining -= sent
+    shutil.copystat(src_path, dst_path)
+
+
+def copy_file(src_path):
     if os.path.isfile(src_path):  # Check if the file exists
         # Copy the file to the target directory, keeping the original filename
-        shutil.copy2(src_path, target_dir)
+        if os.name == 'nt':
+            shutil.copy2(src_path, target_dir)  # Windows already copies via CopyFile2
+        else:
+            try:
+                fast_copy(src_path, os.path.join(target_dir, os.path.basename(src_path)))
+            except OSError:
+                shutil.copy2(src_path, target_dir)  # e.g. cross-filesystem copy_file_range
     else:
-        print(f"File not found: {src_path}")
\ No newline at end of file
+        print(f"File not found: {src_path}")
+
+
+# The CSV column with full file paths is 'file_path'
+# Copies run in a thread pool so the per-file I/O waits overlap instead of queuing up
+with ThreadPoolExecutor(max_workers=max_workers) as executor:
+    list(executor.map(copy_file, file_paths))
\ No newline at end of file
@@ -1,6 +1,13 @@
+import os
+import importlib.util
+
+# Rust downloader with parallel range requests (pip install hf_transfer), must be set before importing huggingface_hub
+if importlib.util.find_spec("hf_transfer"):
+    os.environ.setdefault("HF_HUB_ENABLE_HF_TRANSFER", "1")
+
 from huggingface_hub import snapshot_download
 
 model_id = 'Qwen/Qwen2.5-VL-3B-Instruct'
 local_dir = f'./{model_id.split("/")[-1]}'
 
-snapshot_download(repo_id=model_id, local_dir=local_dir, local_dir_use_symlinks=False)
\ No newline at end of file
+snapshot_download(repo_id=model_id, local_dir=local_dir, max_workers=8)
\ No newline at end of file
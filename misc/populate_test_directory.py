@@ -1,12 +1,20 @@
 import os
 import shutil
 import random
-import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import Callable, List, Dict, Tuple
 import json
+import numpy as np
 from datetime import datetime
 
+# Larger copy buffer (default 64 KB on POSIX, 1 MB on Windows) means fewer read/write calls per image
+shutil.COPY_BUFSIZE = 4 * 1024 * 1024
+
+# Supported image extensions, compared against the lowercased file extension
+IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png'})
+
 
 def set_reproducible_seed(seed_value: int = 42):
     """
@@ -25,11 +33,98 @@ def set_reproducible_seed(seed_value: int = 42):
     return seed_value
 
 
+def link_or_copy(src_path: str, dest_path: Path):
+    """
+    Hardlink a file (no data copied) and fall back to a real copy when linking fails,
+    e.g. across volumes or on file systems without hardlinks such as FAT32.
+    A destination left by an earlier run is kept if it already is this file, else replaced.
+    """
+    if os.path.exists(dest_path) and os.path.samefile(src_path, dest_path):
+        return  # Already linked to the source, copy2 would raise SameFileError
+    if os.path.lexists(dest_path):
+        os.unlink(dest_path)  # os.link won't overwrite an existing file
+    try:
+        os.link(src_path, dest_path)
+    except OSError:
+        shutil.copy2(src_path, dest_path)
+
+
+def copy_files_threaded(source_folder: str,
+                        dest_folder: Path,
+                        filenames: List[str],
+                        max_workers: int = 16,
+                        copy_function: Callable = shutil.copy2) -> int:
+    """
+    Copy files with a thread pool so the per-file I/O waits overlap.
+
+    Args:
+        source_folder: Folder the files are copied from
+        dest_folder: Folder the files are copied into
+        filenames: Names of the files to copy
+        max_workers: Number of concurrent copies
+        copy_function: Function called with (source path, destination path) for each file
+
+    Returns:
+        Number of files copied successfully
+    """
+    copied_count = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(copy_function, os.path.join(source_folder, filename), dest_folder / filename): filename
+            for filename in filenames
+        }
+        for i, future in enumerate(as_completed(futures)):
+            try:
+                future.result()
+                copied_count += 1
+            except Exception as e:
+                print(f"   ❌ Error copying {futures[future]}: {e}")
+
+            # Progress reporting every 50 files (since we're dealing with smaller numbers)
+            if (i + 1) % 50 == 0 or i == len(filenames) - 1:
+                print(f"   📋 Copied {i + 1}/{len(filenames)} images")
+
+    return copied_count
+
+
+def copy_files_robocopy(source_folder: str,
+                        dest_folder: Path,
+                        filenames: List[str],
+                        files_per_call: int = 200) -> int:
+    """
+    Copy files on Windows with robocopy (unbuffered, multithreaded), which is far
+    faster than copying file by file from Python.
+
+    Args:
+        source_folder: Folder the files are copied from
+        dest_folder: Folder the files are copied into
+        filenames: Names of the files to copy
+        files_per_call: Files passed per robocopy call (keeps the command line short)
+
+    Returns:
+        Number of files present in the destination afterwards
+    """
+    for start in range(0, len(filenames), files_per_call):
+        batch = filenames[start:start + files_per_call]
+        result = subprocess.run(
+            ['robocopy', source_folder, str(dest_folder), *batch, '/J', '/MT:16', '/NFL', '/NDL', '/NP', '/NJH', '/NJS'],
+            capture_output=True, text=True
+        )
+        # robocopy exit codes 0-7 mean success, 8 and above mean at least one failure
+        if result.returncode >= 8:
+            print(f"   ❌ robocopy failed (exit code {result.returncode}), falling back to Python copy")
+            copy_files_threaded(source_folder, dest_folder, batch)
+        print(f"   📋 Copied {min(start + files_per_call, len(filenames))}/{len(filenames)} images")
+
+    return sum(1 for filename in filenames if (dest_folder / filename).is_file())
+
+
 def extract_flower_samples_single_seed(source_folder: str,
                                        destination_folder: str,
                                        flower_types: List[str],
                                        samples_per_type: int = 200,
-                                       seed: int = 42) -> Dict[str, int]:
+                                       seed: int = 42,
+                                       use_hardlinks: bool = False) -> Dict[str, int]:
     """
     Extract samples for a single seed/directory.
 
@@ -39,6 +134,8 @@ def extract_flower_samples_single_seed(source_folder: str,
         flower_types: List of flower names to extract
         samples_per_type: Number of samples to extract per flower type
         seed: Random seed for reproducible sampling
+        use_hardlinks: Hardlink the samples instead of copying them (same volume only,
+                       the samples then share their data with the source images)
 
     Returns:
         Dictionary with statistics about processed files
@@ -64,31 +161,32 @@ def extract_flower_samples_single_seed(source_folder: str,
         'timestamp': datetime.now().isoformat()
     }
 
-    # Supported image extensions
-    valid_extensions = ['.jpg', '.jpeg', '.png', '.JPG', '.JPEG', '.PNG']
-
     print(f"🔍 Scanning files in {source_folder}...")
 
     # Verify source folder exists
     if not os.path.exists(source_folder):
         raise FileNotFoundError(f"Source folder not found: {source_folder}")
 
+    # Set lookup for the flower part of {flowername}_{number}.ext filenames
+    flower_set = set(flower_types)
+
     # Collect all matching files for each flower type
     total_files_scanned = 0
-    for filename in os.listdir(source_folder):
-        total_files_scanned += 1
-        file_path = os.path.join(source_folder, filename)
-
-        # Check if it's a file and has a valid image extension
-        if os.path.isfile(file_path) and any(filename.lower().endswith(ext.lower()) for ext in valid_extensions):
-            stats['total_files_found'] += 1
-
-            # Check if the filename matches one of the flower patterns
-            for flower in flower_types:
-                # Using regex to match {flowername}_{number}.ext pattern
-                if re.match(f"^{flower}_\\d+\\.", filename):
+    # scandir reuses the file type from the directory listing, so no extra stat per file
+    with os.scandir(source_folder) as entries:
+        for entry in entries:
+            total_files_scanned += 1
+            filename = entry.name
+
+            # Check if it's a file and has a valid image extension
+            if entry.is_file() and os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS:
+                stats['total_files_found'] += 1
+
+                # Check if the filename matches the {flowername}_{number}.ext pattern with plain string splits
+                stem, dot, _ = filename.partition('.')
+                flower, underscore, number = stem.rpartition('_')
+                if dot and underscore and number.isdecimal() and flower in flower_set:
                     flower_files[flower].append(filename)
-                    break
 
     # Copy random samples for each flower type
     for flower, files in flower_files.items():
@@ -103,11 +201,12 @@ def extract_flower_samples_single_seed(source_folder: str,
         else:
             # Set seed for this specific flower to ensure reproducibility
             flower_seed = seed + hash(flower) % 1000
-            random.seed(flower_seed)
+            rng = np.random.default_rng(flower_seed)
 
-            # Sort files first to ensure consistent ordering across different systems
-            sorted_files = sorted(files)
-            sample_files = random.sample(sorted_files, samples_per_type)
+            # Sort files first (in place) to ensure consistent ordering across different systems
+            files.sort()
+            sample_indices = rng.choice(len(files), samples_per_type, replace=False)
+            sample_files = [files[i] for i in sample_indices]
             print(f"   🎲 Randomly selected {len(sample_files)} images (seed: {flower_seed})")
 
         # Create a subfolder for this flower type
@@ -115,21 +214,13 @@ def extract_flower_samples_single_seed(source_folder: str,
         flower_dest_folder.mkdir(exist_ok=True)
 
         # Copy the files
-        copied_count = 0
-        for i, filename in enumerate(sample_files):
-            src_path = os.path.join(source_folder, filename)
-            dest_path_file = flower_dest_folder / filename
-
-            try:
-                shutil.copy2(src_path, dest_path_file)
-                copied_count += 1
-
-                # Progress reporting every 50 files (since we're dealing with smaller numbers)
-                if (i + 1) % 50 == 0 or i == len(sample_files) - 1:
-                    print(f"   📋 Copied {i + 1}/{len(sample_files)} images")
-
-            except Exception as e:
-                print(f"   ❌ Error copying {filename}: {e}")
+        if use_hardlinks:
+            copied_count = copy_files_threaded(source_folder, flower_dest_folder, sample_files,
+                                               copy_function=link_or_copy)
+        elif os.name == 'nt':
+            copied_count = copy_files_robocopy(source_folder, flower_dest_folder, sample_files)
+        else:
+            copied_count = copy_files_threaded(source_folder, flower_dest_folder, sample_files)
 
         stats['samples_copied'][flower] = copied_count
         print(f"   ✅ Completed: {copied_count} images copied for {flower}")
@@ -141,7 +232,8 @@ def extract_multiple_seed_datasets(source_folder: str,
                                    base_destination_folder: str,
                                    flower_types: List[str],
                                    seeds: List[int],
-                                   samples_per_type: int = 200) -> Dict[int, Dict]:
+                                   samples_per_type: int = 200,
+                                   use_hardlinks: bool = False) -> Dict[int, Dict]:
     """
     Create multiple datasets with different seeds.
 
@@ -151,6 +243,7 @@ def extract_multiple_seed_datasets(source_folder: str,
         flower_types: List of flower names to extract
         seeds: List of seeds to use for creating different datasets
         samples_per_type: Number of samples to extract per flower type per seed
+        use_hardlinks: Hardlink the samples instead of copying them
 
     Returns:
         Dictionary mapping seed to statistics for that dataset
@@ -179,7 +272,8 @@ def extract_multiple_seed_datasets(source_folder: str,
                 destination_folder=str(seed_dir),
                 flower_types=flower_types,
                 samples_per_type=samples_per_type,
-                seed=seed
+                seed=seed,
+                use_hardlinks=use_hardlinks
             )
 
             # Save metadata for this seed
@@ -315,6 +409,7 @@ if __name__ == "__main__":
     # Define the seeds for creating different datasets
     SEEDS = [42, 123, 456]  # 🌱 Three different seeds for three datasets
     SAMPLES_PER_TYPE = 200  # 📊 200 samples per flower type
+    USE_HARDLINKS = False  # 🔗 Hardlink instead of copy, only for test sets that are never modified (they share the source's data)
 
     print(f"🚀 Starting creation of multiple flower sample datasets:")
     print(f"   Source: {source_folder}")
@@ -332,7 +427,8 @@ if __name__ == "__main__":
             base_destination_folder=base_destination_folder,
             flower_types=flower_types,
             seeds=SEEDS,
-            samples_per_type=SAMPLES_PER_TYPE
+            samples_per_type=SAMPLES_PER_TYPE,
+            use_hardlinks=USE_HARDLINKS
         )
 
         print(f"\n🎉 All datasets created successfully!")
@@ -2,10 +2,20 @@ import traceback
 
 import pyiqa
 import os
+import csv
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 import torch
+from torchvision.transforms.functional import pil_to_tensor
 import time
-import pandas as pd
+
+try:
+    # libjpeg-turbo decoding (pip install PyTurboJPEG) is several times faster than Pillow's JPEG decoder
+    from turbojpeg import TurboJPEG, TJPF_RGB
+    jpeg_decoder = TurboJPEG()
+except (ImportError, RuntimeError):
+    jpeg_decoder = None  # PyTurboJPEG or the libturbojpeg library is missing, fall back to Pillow
 
 # Set up the NIQE metric
 tic = time.perf_counter()
@@ -16,54 +26,127 @@ niqe_metric = pyiqa.create_metric('niqe', device=device)
 print("Model loaded")
 
 
-# Create list to store data
-valid_images = []
-valid_scores = []
-corrupted_images = []
-corrupted_errors = []
-
 # Define the folder with images
 image_folder = r"D:\iNaturalist\test_3000"
+IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png'})  # Compared against the lowercased file extension
 image_paths = [os.path.join(image_folder, img) for img in os.listdir(image_folder)
-              if img.lower().endswith(('.jpg','.jpeg','.png'))]
+              if os.path.splitext(img)[1].lower() in IMAGE_EXTENSIONS]
 
-# Loop through each image and calculate NIQE score
-for image_path in image_paths:
-    print(f"\nChecking out: {image_path}")
-    try:
-        # Load the image using PIL (Python Image Library)
-        img = Image.open(image_path).convert('RGB') # Convert to RGB if it isn't
-        img.verify()  # Verify image integrity
-        img = Image.open(image_path).convert('RGB')
-        # Calculate NIQE score (pyiqa handles the conversion to tensor internally)
-        score = niqe_metric(img).item() # .item() gets the raw number form the tensor
-        print(f"NIQE score: {score:.4f} (Lower is better)")
-
-        # Append to lists
-        valid_images.append(image_path)
-        valid_scores.append(score)
-    except Exception as e:
-        # Catch errors related to corrupted images or processing failures
-        print(f"Bad image detected: {image_path} (Error: {str(e)})")
-        # Append to currupted list
-        corrupted_images.append(image_path)
-        corrupted_errors.append(str(e))
-
-
-
-# Create a Pandas DataFrame
-valid_data = {'Image_Path': valid_images, 'NIQE_score': valid_scores}
-valid_df = pd.DataFrame(valid_data)
-corrupted_data = {'Image_Path': corrupted_images, 'Error: ': corrupted_errors}
-corrupted_df = pd.DataFrame(corrupted_data)
-
-# Save the DataFrame to a CSV file
+# CSV files the results are written to as they come in, so a crash doesn't lose a long run
 valid_csv_file = 'valid_niqe_results3000.csv'
-valid_df.to_csv(valid_csv_file, index=False) # index=False avoids adding an extra index column
-print(f"\nValid results saved to {valid_csv_file}!")
-
 corrupted_csv = "niqe_corrupted_images3000.csv"
-corrupted_df.to_csv(corrupted_csv, index=False)
+
+NIQE_BATCH = 16  # Images gathered per scoring step, images of the same size share one NIQE call
+PREFETCH_IMAGES = 32  # Images decoded ahead by worker threads while NIQE scores the current ones
+
+
+def open_image(image_path):
+    # Decode an image to RGB, using libjpeg-turbo for JPEGs when it is available
+    if jpeg_decoder is not None and image_path.lower().endswith(('.jpg', '.jpeg')):
+        with open(image_path, 'rb') as f:
+            data = f.read()
+        try:
+            return Image.fromarray(jpeg_decoder.decode(data, pixel_format=TJPF_RGB))
+        except OSError:
+            pass  # CMYK JPEGs or other formats with a .jpg name, Pillow detects the real format below
+    return Image.open(image_path).convert('RGB')
+
+
+def load_image(image_path):
+    # Load the image, decoding it once
+    # Corrupted or truncated files raise UnidentifiedImageError/OSError here and end up in the corrupted CSV
+    img = open_image(image_path) # Convert to RGB if it isn't
+    # Keep it as a [3, H, W] uint8 tensor, 4x smaller than float32 while it waits in the prefetch queue
+    return pil_to_tensor(img)
+
+
+def image_size_key(image_path):
+    # Width and height from the file header only (no decode), used to sort images of the same size together
+    try:
+        with Image.open(image_path) as img:
+            return img.size
+    except Exception:
+        return 0, 0  # Unreadable images are reported when they are loaded
+
+
+def prefetch_images(paths, executor):
+    # Yield (path, future) pairs, keeping up to PREFETCH_IMAGES images being decoded ahead
+    pending = deque()
+    for path in paths:
+        pending.append((path, executor.submit(load_image, path)))
+        if len(pending) > PREFETCH_IMAGES:
+            yield pending.popleft()
+    while pending:
+        yield pending.popleft()
+
+
+def to_niqe_input(tensors):
+    # Move uint8 [3, H, W] tensors to the device first (a 4x smaller copy), then make the
+    # [N, 3, H, W] float batch in [0, 1] that pyiqa expects
+    return torch.stack(tensors).to(device).float() / 255
+
+
+def score_chunk(chunk, valid_writer, corrupted_writer):
+    # Group the decoded images by exact size so each group can be stacked into one batch.
+    # The images are sorted by size beforehand, so images of the same size arrive in the same chunks
+    groups = {}
+    for image_path, loaded in chunk:
+        print(f"\nChecking out: {image_path}")
+        try:
+            tensor = loaded.result()
+            groups.setdefault(tuple(tensor.shape), []).append((image_path, tensor))
+        except Exception as e:
+            # Catch errors related to corrupted images
+            print(f"Bad image detected: {image_path} (Error: {str(e)})")
+            corrupted_writer.writerow([image_path, str(e)])
+
+    for group in groups.values():
+        try:
+            # Calculate NIQE scores for the whole group in one call (one score per image)
+            batch = to_niqe_input([tensor for _, tensor in group])
+            scores = niqe_metric(batch).flatten().tolist()
+            scored = [(image_path, score) for (image_path, _), score in zip(group, scores)]
+        except Exception:
+            # Score one by one so a single failing image doesn't take the group with it
+            scored = []
+            for image_path, tensor in group:
+                try:
+                    scored.append((image_path, niqe_metric(to_niqe_input([tensor])).item()))
+                except Exception as e:
+                    print(f"Bad image detected: {image_path} (Error: {str(e)})")
+                    corrupted_writer.writerow([image_path, str(e)])
+
+        for image_path, score in scored:
+            print(f"{image_path} NIQE score: {score:.4f} (Lower is better)")
+            # Write the score straight to the CSV
+            valid_writer.writerow([image_path, score])
+
+
+# Loop through the images and calculate NIQE scores
+with open(valid_csv_file, 'w', newline='') as valid_file, \
+        open(corrupted_csv, 'w', newline='') as corrupted_file, \
+        ThreadPoolExecutor(max_workers=4) as executor:
+    valid_writer = csv.writer(valid_file)
+    valid_writer.writerow(['Image_Path', 'NIQE_score'])
+    corrupted_writer = csv.writer(corrupted_file)
+    corrupted_writer.writerow(['Image_Path', 'Error: '])
+
+    # Sort by size so the chunks hold runs of identically sized images that NIQE can score together
+    size_keys = list(executor.map(image_size_key, image_paths))
+    image_paths = [image_path for _, image_path in sorted(zip(size_keys, image_paths))]
+
+    chunk = []
+    for image_path, loaded in prefetch_images(image_paths, executor):
+        chunk.append((image_path, loaded))
+        if len(chunk) == NIQE_BATCH:
+            score_chunk(chunk, valid_writer, corrupted_writer)
+            chunk = []
+            valid_file.flush()
+            corrupted_file.flush()
+    if chunk:
+        score_chunk(chunk, valid_writer, corrupted_writer)
+
+print(f"\nValid results saved to {valid_csv_file}!")
 print(f"Corrupted images logged to {corrupted_csv}! Check it out!")
 
 
@@ -1,21 +1,53 @@
 import os
 import csv
 import time
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import glob
 import torch
+import torch.multiprocessing as mp
 from PIL import Image
-from transformers import Qwen2_5_VLForConditionalGeneration, AutoProcessor
-from qwen_vl_utils import process_vision_info
+from torch.utils.data import Dataset, DataLoader
+from torchvision.io import decode_image, decode_jpeg, read_file, ImageReadMode
+from torchvision.transforms.v2.functional import resize, pil_to_tensor
+from transformers import Qwen2_5_VLForConditionalGeneration, AutoProcessor, BitsAndBytesConfig
+from qwen_vl_utils import fetch_image
+
+try:
+    # libjpeg-turbo decoding (pip install PyTurboJPEG) is several times faster than Pillow's JPEG decoder
+    from turbojpeg import TurboJPEG, TJPF_RGB
+    jpeg_decoder = TurboJPEG()
+except (ImportError, RuntimeError):
+    jpeg_decoder = None  # PyTurboJPEG or the libturbojpeg library is missing, fall back to Pillow
+
+# Inference only, so never record autograd history
+torch.set_grad_enabled(False)
 
 
-tic = time.perf_counter()
-# Load the model and processor
 model_id = "Qwen2.5-VL-3B-Instruct"
-model = Qwen2_5_VLForConditionalGeneration.from_pretrained(
-    model_id,
-    torch_dtype=torch.bfloat16,  # Use lower precision for 16GB VRAM
-    device_map="auto",
-)
-processor = AutoProcessor.from_pretrained(model_id)
+# FlashAttention-2 if flash-attn is installed (pip install flash-attn --no-build-isolation), else PyTorch's fused SDPA
+attn_implementation = "flash_attention_2" if importlib.util.find_spec("flash_attn") else "sdpa"
+# 4-bit NF4 weights (needs bitsandbytes) cut weight memory and bandwidth ~4x, set to False for plain bf16 weights
+LOAD_IN_4BIT = True
+# torch.compile the forward pass, bitsandbytes 4-bit layers can't be compiled so quantized models run eagerly
+COMPILE_MODEL = not (LOAD_IN_4BIT and importlib.util.find_spec("bitsandbytes"))
+
+BATCH_SIZE = 8  # Images per forward pass, lower this if you run out of VRAM
+PAD_TO_MULTIPLE_OF = 64  # Rounds prompt lengths up so batches share a few shapes and reuse compiled graphs
+NUM_WORKERS = min(8, os.cpu_count() or 1)  # DataLoader processes decoding and preprocessing images
+PREFETCH_FACTOR = 2  # Batches each worker prepares ahead while the GPU is busy
+# Images are downscaled (keeping their aspect ratio) to at most this many pixels for the vision encoder
+IMAGE_MAX_PIXELS = 896 * 896
+# Opt-in, e.g. 896: stretch every image to this height and width (a multiple of the 28 px patch merge size) so each
+# batch has the same number of patches and prompt tokens. The aspect ratio is NOT kept, which changes what the model
+# sees, but a compiled model can then replay CUDA graphs. None keeps the aspect ratio (IMAGE_MAX_PIXELS cap only)
+STATIC_IMAGE_SIZE = None
+# CUDA graphs are only worth capturing when every batch has the same shapes
+USE_CUDA_GRAPHS = COMPILE_MODEL and STATIC_IMAGE_SIZE is not None
+# Decode JPEGs with nvJPEG on the GPU and resize/normalize them there too (needs CUDA and the fast image processor),
+# workers then only read the raw file bytes; set to False to decode and preprocess on the CPU workers instead
+GPU_JPEG_DECODE = False
 
 
 # Define the folder containing images and output CSV file
@@ -23,75 +55,418 @@ image_folder = r"D:\iNaturalist\test_3000"
 
 
 output_csv = "blurry_results_qwen.csv"
+# Each GPU writes its own part of the results next to output_csv, they are merged into output_csv at the end
+rank_csv_pattern = os.path.splitext(output_csv)[0] + ".gpu{}.csv"
 prompt = f"Does the image contain other taxa than the one? Answer only Yes or No."
 
+IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png'})  # Compared against the lowercased file extension
+
+
+def jpeg_scale(width, height, max_pixels):
+    """Largest JPEG decode downscale factor (8, 4 or 2) that still leaves at least max_pixels pixels, else 1."""
+    for scale in (8, 4, 2):
+        if (width // scale) * (height // scale) >= max_pixels:
+            return scale
+    return 1
+
+
+def open_image(image_path, max_pixels=None):
+    """
+    Decode an image to RGB, using libjpeg-turbo for JPEGs when it is available.
+
+    With max_pixels, large JPEGs are decoded straight at 1/2, 1/4 or 1/8 size (nearly free in the
+    JPEG decoder) as long as that still leaves at least max_pixels pixels for the final resize.
+    """
+    if jpeg_decoder is not None and image_path.lower().endswith(('.jpg', '.jpeg')):
+        with open(image_path, 'rb') as f:
+            data = f.read()
+        try:
+            scale = 1
+            if max_pixels:
+                width, height, _, _ = jpeg_decoder.decode_header(data)
+                scale = jpeg_scale(width, height, max_pixels)
+            return Image.fromarray(jpeg_decoder.decode(data, pixel_format=TJPF_RGB, scaling_factor=(1, scale)))
+        except OSError:
+            pass  # Not something libjpeg-turbo can turn into RGB (CMYK, or another format named .jpg), use Pillow
+
+    image = Image.open(image_path)
+    if max_pixels and image.format == 'JPEG':
+        scale = jpeg_scale(image.width, image.height, max_pixels)
+        image.draft('RGB', (image.width // scale, image.height // scale))
+    return image.convert('RGB')
+
+
+class IQADataset(Dataset):
+    """Images decoded and resized in DataLoader workers, as (image_path, image, error) samples."""
+
+    def __init__(self, image_paths, gpu_decode=False):
+        self.image_paths = image_paths
+        self.gpu_decode = gpu_decode  # Return raw JPEG bytes / uint8 CHW tensors for gpu_preprocess
+
+    def __len__(self):
+        return len(self.image_paths)
+
+    def __getitem__(self, index):
+        image_path = self.image_paths[index]
+        try:
+            if self.gpu_decode:
+                # JPEGs stay encoded until the main process decodes the whole batch on the GPU
+                if image_path.lower().endswith(('.jpg', '.jpeg')):
+                    return image_path, read_file(image_path), None
+                return image_path, decode_image(read_file(image_path), mode=ImageReadMode.RGB), None
+
+            # The prompt text is fixed (rendered once in the main process), so only resize the image here
+            # instead of building a chat message for process_vision_info to walk through
+            if STATIC_IMAGE_SIZE is not None:
+                size = {"resized_height": STATIC_IMAGE_SIZE, "resized_width": STATIC_IMAGE_SIZE}
+            else:
+                size = {"max_pixels": IMAGE_MAX_PIXELS}
+            image = fetch_image({"image": open_image(image_path, IMAGE_MAX_PIXELS), **size})
+            return image_path, image, None
+        except Exception as e:
+            # Unreadable images are reported back instead of failing the whole batch
+            return image_path, None, str(e)
+
 
-# Check if the directory exists
-if not os.path.exists(image_folder):
-    print(f"Error: Directory {image_folder} does not exist. Please create it and add your images.")
-    exit(1)
+def init_worker(worker_id):
+    """Give each DataLoader worker a single intra-op thread, the workers already use every core between them."""
+    torch.set_num_threads(1)
 
 
-# Prepare CSV file to store results
-results = []
-image_paths = [os.path.join(image_folder, img) for img in os.listdir(image_folder)
-              if img.endswith(('.jpg', '.png','.JPG','.png','.PNG', '.jpeg'))]
+def fill_batch(images):
+    """
+    Repeat the last image up to BATCH_SIZE when CUDA graphs are used, so a short batch has the same shapes as
+    the others and replays the captured CUDA graph instead of recording a new one. The extra rows' answers are
+    dropped by zip().
+    """
+    if not USE_CUDA_GRAPHS:
+        return images
+    return images + [images[-1]] * (BATCH_SIZE - len(images))
 
 
-if not image_paths:
-    print(f"No images found in {image_folder}. Please add images in JPG, JPEG, or PNG format.")
-    exit(1)
+def collate_batch(samples, processor, text):
+    """
+    Tokenize and pad the images that loaded into one batch of model inputs.
 
+    Returns (image_paths, inputs, errors), inputs is None when no image in the batch loaded.
+    """
+    valid = [(image_path, image) for image_path, image, error in samples if error is None]
+    errors = [(image_path, error) for image_path, _, error in samples if error is not None]
+    if not valid:
+        return [], None, errors
 
-# Process each image
-for image_file in image_paths:
-    image_path = os.path.join(image_folder, image_file)
+    image_paths, images = zip(*valid)
+    images = fill_batch(list(images))
+    inputs = processor(
+        text=[text] * len(images),  # Same rendered chat template for every image
+        images=images,
+        videos=None,
+        padding=True,
+        pad_to_multiple_of=PAD_TO_MULTIPLE_OF,
+        return_tensors="pt",
+    )
+    # Match the bf16 compute dtype of the (4-bit) model, which also halves the bytes copied to the GPU
+    inputs["pixel_values"] = inputs["pixel_values"].to(torch.bfloat16)
+    return list(image_paths), dict(inputs), errors
+
+
+def collate_encoded(samples):
+    """Batch the raw JPEG bytes / decoded tensors as a list for gpu_preprocess, in the same shape as collate_batch."""
+    valid = [(image_path, image) for image_path, image, error in samples if error is None]
+    errors = [(image_path, error) for image_path, _, error in samples if error is not None]
+    if not valid:
+        return [], None, errors
+    image_paths, images = zip(*valid)
+    return list(image_paths), list(images), errors
+
+
+def image_size_key(image_path):
+    """Sort key grouping images that end up with a similar number of vision tokens (reads the file header only)."""
     try:
-        # Prepare input for the model
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {"type": "image", "image": f"file://{image_path}"},
-                    {"type": "text", "text": prompt}
-                ]
-            }
-        ]
-        text = processor.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
-        image_inputs, video_inputs = process_vision_info(messages)
-        inputs = processor(
-            text=[text],
-            images=image_inputs,
-            videos=video_inputs,
-            padding=True,
-            return_tensors="pt",
-        ).to(model.device)
-
-        # Generate response
-        generated_ids = model.generate(**inputs, max_new_tokens=10)
-        generated_ids_trimmed = [
-            out_ids[len(in_ids):] for in_ids, out_ids in zip(inputs.input_ids, generated_ids)
-        ]
-        response = processor.batch_decode(generated_ids_trimmed, skip_special_tokens=True,
-                                          clean_up_tokenization_spaces=False)[0].strip()
-
-        # Extract Yes/No from response
-        result = "Yes" if "Yes" in response else "No"
-        results.append([image_file, result])
-        print(f"Processed {image_file}: {result}")
-    except Exception as e:
-        print(f"Error processing {image_file}: {str(e)}")
-        results.append([image_file, "Error"])
-
-
-# Save results to CSV
-with open(output_csv, mode='w', newline='') as file:
-    writer = csv.writer(file)
-    writer.writerow(["Image Name", "Blurry"])
-    writer.writerows(results)
-
-print(f"Results saved to {output_csv}")
-
-
-toc = time.perf_counter()
-print(f"Model finished in {toc - tic:0.4f}")
\ No newline at end of file
+        with Image.open(image_path) as image:
+            width, height = image.size
+    except Exception:
+        return 0, 0  # Unreadable images are reported by the dataset later
+    return min(width * height, IMAGE_MAX_PIXELS), width / height
+
+
+def to_device(inputs):
+    """
+    Start copying a pinned batch to the GPU, on the copy stream when running on CUDA.
+
+    Returns (inputs, copy_done), copy_done is an event marking the end of just this batch's copies (None on CPU).
+    """
+    if copy_stream is None:
+        return {key: value.to(model.device) for key, value in inputs.items()}, None
+    with torch.cuda.stream(copy_stream):
+        inputs = {key: value.to(model.device, non_blocking=True) for key, value in inputs.items()}
+    copy_done = torch.cuda.Event()
+    copy_done.record(copy_stream)
+    return inputs, copy_done
+
+
+def prefetch_to_device(loader):
+    """
+    Yield the loader's batches as (image_paths, inputs, copy_done, errors) with inputs on the GPU,
+    copying the next batch while the current one runs.
+    """
+    pending = None
+    for batch_names, inputs, errors in loader:
+        inputs, copy_done = to_device(inputs) if inputs is not None else (None, None)
+        staged = (batch_names, inputs, copy_done, errors)
+        if pending is not None:
+            yield pending
+        pending = staged
+    if pending is not None:
+        yield pending
+
+
+def gpu_preprocess(image_paths, images, text):
+    """
+    Decode a batch from collate_encoded on the GPU (nvJPEG) and resize, normalize and patchify it there.
+
+    Returns (image_paths, inputs, errors) like collate_batch, with inputs already on the GPU.
+    """
+    decoded, errors = {}, []
+    jpegs = [(index, image) for index, image in enumerate(images) if image.dim() == 1]  # Raw bytes are 1-D
+    if jpegs:
+        try:
+            batch = decode_jpeg([data for _, data in jpegs], mode=ImageReadMode.RGB, device=model.device)
+            decoded.update(zip([index for index, _ in jpegs], batch))
+        except RuntimeError:
+            # One file nvJPEG can't handle fails the batched call, so decode one by one to find it
+            for index, data in jpegs:
+                try:
+                    decoded[index] = decode_jpeg(data, mode=ImageReadMode.RGB, device=model.device)
+                except RuntimeError:
+                    # CMYK JPEGs or other formats named .jpg still open on the CPU, only truly broken files are errors
+                    try:
+                        image = pil_to_tensor(open_image(image_paths[index], IMAGE_MAX_PIXELS))
+                        decoded[index] = image.to(model.device)
+                    except Exception as e:
+                        errors.append((image_paths[index], str(e)))
+    for index, image in enumerate(images):
+        if image.dim() == 3:  # PNGs were decoded by the worker
+            decoded[index] = image.to(model.device, non_blocking=True)
+
+    kept = sorted(decoded)
+    if not kept:
+        return [], None, errors
+    batch_images = [decoded[index] for index in kept]
+    if STATIC_IMAGE_SIZE is not None:
+        # Fixed shapes for the captured CUDA graphs, the processor leaves an already 28 px aligned size alone
+        batch_images = [resize(image, [STATIC_IMAGE_SIZE, STATIC_IMAGE_SIZE], antialias=True) for image in batch_images]
+    batch_images = fill_batch(batch_images)
+    inputs = processor(
+        text=[text] * len(batch_images),
+        images=batch_images,
+        videos=None,
+        padding=True,
+        pad_to_multiple_of=PAD_TO_MULTIPLE_OF,
+        max_pixels=IMAGE_MAX_PIXELS,
+        device=model.device,  # Resize and normalize on the GPU with the fast image processor
+        return_tensors="pt",
+    )
+    inputs = {key: value.to(model.device) for key, value in inputs.items()}
+    inputs["pixel_values"] = inputs["pixel_values"].to(torch.bfloat16)
+    return [image_paths[index] for index in kept], inputs, errors
+
+
+def classify_batch(inputs, copy_done=None):
+    """Score the Yes/No answer for each image in the batch with a single forward pass."""
+    if copy_done is not None:
+        # Wait for this batch's copy only (not the next batch's, already queued behind it on the copy stream),
+        # and keep its memory alive until the compute stream is done with it
+        torch.cuda.current_stream().wait_event(copy_done)
+        for value in inputs.values():
+            value.record_stream(torch.cuda.current_stream())
+
+    # Only the first answer token matters, so one forward pass replaces generate(), without autograd bookkeeping
+    with torch.inference_mode():
+        logits = model(**inputs, use_cache=False, logits_to_keep=1).logits[:, -1, :]
+
+    # Pick whichever of "Yes" and "No" the model finds more likely
+    is_yes = logits[:, yes_token_id] > logits[:, no_token_id]
+    return ["Yes" if answer else "No" for answer in is_yes.tolist()]
+
+
+def run(rank, world_size, image_paths):
+    """Load a model copy on GPU `rank` and classify every world_size-th image, writing to that GPU's CSV."""
+    global model, processor, copy_stream, yes_token_id, no_token_id
+
+    # The patch embedding Conv3d sees a new input shape whenever the patch count changes, and cuDNN would re-autotune
+    # for each one, so only benchmark kernels when every batch has the same shapes (STATIC_IMAGE_SIZE).
+    # No TF32 flags: the model computes in bf16 (NF4 weights are dequantized to bf16), so they would change nothing
+    torch.backends.cudnn.benchmark = STATIC_IMAGE_SIZE is not None
+    if torch.cuda.is_available():
+        torch.cuda.set_device(rank)
+
+    # Load the model and processor
+    print(f"GPU {rank}: using {attn_implementation} attention")
+    quantization_config = BitsAndBytesConfig(
+        load_in_4bit=True,
+        bnb_4bit_quant_type="nf4",
+        bnb_4bit_compute_dtype=torch.bfloat16,
+        bnb_4bit_use_double_quant=True,
+        # The vision tower is small next to the LLM, keep it (and lm_head) in bf16 so it can be compiled below
+        llm_int8_skip_modules=["visual", "lm_head"],
+    ) if LOAD_IN_4BIT and importlib.util.find_spec("bitsandbytes") else None
+    model = Qwen2_5_VLForConditionalGeneration.from_pretrained(
+        model_id,
+        torch_dtype=torch.bfloat16,  # Use lower precision for 16GB VRAM
+        device_map={"": rank} if torch.cuda.is_available() else "auto",  # A whole model copy per GPU
+        attn_implementation=attn_implementation,
+        quantization_config=quantization_config,
+    )
+    model.eval()
+    # Compiling the forward pass cuts Python dispatch and kernel launch overhead
+    if USE_CUDA_GRAPHS:
+        model.forward = torch.compile(model.forward, mode="reduce-overhead", dynamic=False)
+    elif COMPILE_MODEL:
+        # Patch and prompt lengths vary per batch, CUDA graphs would be re-recorded for every new shape
+        model.forward = torch.compile(model.forward, dynamic=True)
+    else:
+        # The 4-bit LLM stays eager, but the bf16 vision encoder still gets fused kernels (patch counts vary per batch)
+        model.visual.forward = torch.compile(model.visual.forward, dynamic=True)
+    gpu_decode = GPU_JPEG_DECODE and torch.cuda.is_available()
+    # The fast image processor resizes/normalizes with fused torch ops instead of numpy, and can also run on the GPU
+    processor = AutoProcessor.from_pretrained(model_id, use_fast=True)
+    processor.tokenizer.padding_side = "left"  # Left padding keeps every prompt ending at the last position of the batch
+    # Separate CUDA stream for host-to-device copies, so they overlap with the forward pass
+    copy_stream = torch.cuda.Stream() if torch.cuda.is_available() else None
+    # Token ids of the two possible answers, as the first token after the assistant prompt
+    yes_token_id = processor.tokenizer.encode("Yes", add_special_tokens=False)[0]
+    no_token_id = processor.tokenizer.encode("No", add_special_tokens=False)[0]
+
+
+    # Render the chat template once, the image placeholder tokens are expanded per image by the processor
+    template_messages = [
+        {
+            "role": "user",
+            "content": [
+                {"type": "image"},
+                {"type": "text", "text": prompt}
+            ]
+        }
+    ]
+    text = processor.apply_chat_template(template_messages, tokenize=False, add_generation_prompt=True)
+
+    # Workers decode, resize and tokenize the next batches while the GPU works on the current one
+    loader = DataLoader(
+        # Every world_size-th image of the size-sorted list, so each GPU gets a similar mix of image sizes
+        IQADataset(image_paths[rank::world_size], gpu_decode=gpu_decode),
+        batch_size=BATCH_SIZE,
+        collate_fn=collate_encoded if gpu_decode else partial(collate_batch, processor=processor, text=text),
+        num_workers=max(1, NUM_WORKERS // world_size),  # The GPUs share the CPU cores
+        prefetch_factor=PREFETCH_FACTOR,
+        worker_init_fn=init_worker,
+        pin_memory=torch.cuda.is_available(),
+    )
+
+    # Prepare CSV file to store results, each batch is written as soon as it's done so a crash loses nothing
+    with open(rank_csv_pattern.format(rank), mode='w', newline='', buffering=1) as file:
+        writer = csv.writer(file)
+        writer.writerow(["Image Name", "Blurry"])
+
+        # Process the images in batches, images that failed to load never reach the GPU
+        batches = (((batch_names, inputs, None, errors) for batch_names, inputs, errors in loader) if gpu_decode
+                   else prefetch_to_device(loader))
+        for batch_names, inputs, copy_done, errors in batches:
+            if gpu_decode and inputs is not None:
+                try:
+                    batch_names, inputs, decode_errors = gpu_preprocess(batch_names, inputs, text)
+                    errors = errors + decode_errors
+                except Exception as e:
+                    errors = errors + [(image_file, str(e)) for image_file in batch_names]
+                    inputs = None
+            for image_file, error in errors:
+                print(f"Error processing {os.path.basename(image_file)}: {error}")
+                writer.writerow([image_file, "Error"])
+            if inputs is None:
+                continue
+
+            try:
+                batch_results = classify_batch(inputs, copy_done)
+            except Exception as e:
+                print(f"Error processing batch: {str(e)}")
+                batch_results = ["Error"] * len(batch_names)
+
+            writer.writerows(zip(batch_names, batch_results))
+            for image_file, result in zip(batch_names, batch_results):
+                if result != "Error":
+                    print(f"Processed {os.path.basename(image_file)}: {result}")
+
+
+def merge_results(rows):
+    """Write rows plus every GPU's CSV into output_csv, then remove the per-GPU files."""
+    rank_csvs = sorted(glob.glob(rank_csv_pattern.format("*")))
+    with open(output_csv, mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(["Image Name", "Blurry"])
+        writer.writerows(rows)
+        for rank_csv in rank_csvs:
+            with open(rank_csv, newline='') as rank_file:
+                writer.writerows(row for row in list(csv.reader(rank_file))[1:] if len(row) == 2)
+    for rank_csv in rank_csvs:
+        os.remove(rank_csv)
+
+
+# Spawned GPU processes and DataLoader workers re-import this file, so only the main process scans and shards the images
+if __name__ == "__main__":
+    tic = time.perf_counter()
+
+    # Check if the directory exists
+    if not os.path.exists(image_folder):
+        print(f"Error: Directory {image_folder} does not exist. Please create it and add your images.")
+        exit(1)
+
+
+    # scandir entries carry the full path already, so no extra os.path.join per image
+    with os.scandir(image_folder) as entries:
+        image_paths = [entry.path for entry in entries
+                       if os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS]
+
+
+    if not image_paths:
+        print(f"No images found in {image_folder}. Please add images in JPG, JPEG, or PNG format.")
+        exit(1)
+
+    # Resume: fold the per-GPU CSVs of an interrupted run into output_csv first, then keep its finished rows
+    # and only process the remaining images (errors are retried)
+    if glob.glob(rank_csv_pattern.format("*")):
+        previous_rows = []
+        if os.path.exists(output_csv):
+            with open(output_csv, newline='') as file:
+                previous_rows = [row for row in list(csv.reader(file))[1:] if len(row) == 2]
+        merge_results(previous_rows)
+    done_rows = []
+    if os.path.exists(output_csv):
+        with open(output_csv, newline='') as file:
+            done_rows = [row for row in list(csv.reader(file))[1:] if len(row) == 2 and row[1] != "Error"]
+        done = {row[0] for row in done_rows}
+        image_paths = [path for path in image_paths if path not in done]
+        print(f"Resuming: {len(done_rows)} images already in {output_csv}, {len(image_paths)} left to process")
+
+
+    # Sort by size so each batch holds similarly sized images and little compute goes to padding tokens
+    # (with STATIC_IMAGE_SIZE every image has the same size, so there is no padding to save)
+    if STATIC_IMAGE_SIZE is None:
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            size_keys = list(executor.map(image_size_key, image_paths))
+        image_paths = [path for _, path in sorted(zip(size_keys, image_paths))]
+
+
+    # One process with its own model copy per GPU, the images are independent so no communication is needed
+    world_size = max(1, torch.cuda.device_count())
+    if world_size > 1:
+        print(f"Splitting {len(image_paths)} images across {world_size} GPUs")
+        mp.spawn(run, args=(world_size, image_paths), nprocs=world_size)
+    else:
+        run(0, 1, image_paths)
+
+    merge_results(done_rows)
+    print(f"Results saved to {output_csv}")
+
+
+    toc = time.perf_counter()
+    print(f"Model finished in {toc - tic:0.4f}")
\ No newline at end of file